@@ -0,0 +1,249 @@
+"""Micro-benchmarks hors ligne de ungaro_monitor.py
+
+Mesure l'encodage des trames, les fonctions analyser_*, la sérialisation
+MQTT Discovery et la publication d'un cycle complet vers un faux client MQTT.
+
+Usage:
+    python3 benchmarks/bench_ungaro_monitor.py --enregistrer   # crée/écrase la référence
+    python3 benchmarks/bench_ungaro_monitor.py                 # compare à la référence
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import timeit
+
+REPERTOIRE_ADDON = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPERTOIRE_ADDON)
+
+import ungaro_monitor as um  # noqa: E402
+
+FICHIER_REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SEUIL_REGRESSION = 0.25
+ECART_MIN_US = 5.0
+NB_REPETITIONS = 21
+DUREE_REPETITION = 0.05
+# Nombre de passages sur le lot de réponses dans un appel d'un cas analyser_*
+NB_PASSAGES_LOT = 20
+
+# Réponse vide renvoyée par le proxy quand le bridge n'a pas répondu
+REPONSE_VIDE = "\x08\r"
+
+# Réponses types du bridge pour chaque fonction analyser_*
+#   valide:    (réponse attendue, valeur décodée attendue)
+#   negative:  refus du bridge (commande renvoyée telle quelle ou réponse vide)
+#   malformee: réponse non numérique
+# Les réponses négatives et malformées doivent être rejetées par l'analyseur.
+REPONSES = {
+    "etat_chaudiere": {
+        "valide": [("\x08J30001000000000006\r", (6, "Modulation"))],
+        "negative": ["\x08I30001000000000000\r", REPONSE_VIDE],
+        "malformee": ["\x08J30001000000000abc\r"],
+    },
+    "erreur_chaudiere": {
+        "valide": [("\x08J30002000000000012\r", (12, "Échec de l'allumage"))],
+        "negative": ["\x08I30002000000000000\r", REPONSE_VIDE],
+        "malformee": ["\x08J3000200000000001x\r"],
+    },
+    "temperature_fumee": {
+        "valide": [("\x08J30005000000000142\r", 142)],
+        "negative": ["\x08I30005000000000000\r", REPONSE_VIDE],
+        "malformee": ["\x08J300050000000001x2\r"],
+    },
+    "puissance_combustion": {
+        "valide": [("\x08J30011000000000003\r", 3)],
+        "negative": ["\x08I30011000000000000\r", REPONSE_VIDE],
+        "malformee": ["\x08J300110000000000x3\r"],
+    },
+    "temperature_eau": {
+        "valide": [("\x08J30017000000000065\r", 65)],
+        "negative": ["\x08I30017000000000000\r", REPONSE_VIDE],
+        "malformee": ["\x08J3001700000000006-\r"],
+    },
+    "temperature_exterieure_chaudiere": {
+        "valide": [("\x08I30044000000000015\r", 15), ("\x08I30044000000-00002\r", -2)],
+        "negative": ["\x08J30044000000000000\r", REPONSE_VIDE],
+        "malformee": ["\x08I30044000000--0002\r"],
+    },
+    "pression_eau": {
+        "valide": [("\x08J30020000000001350\r", 1.35)],
+        "negative": ["\x08I30020000000000000\r", REPONSE_VIDE],
+        "malformee": ["\x08J300200000000013x0\r"],
+    },
+    "temperature_consigne_eau": {
+        "valide": [("\x08B20180000000000065\r", 65)],
+        "negative": ["\x08A20180000000000000\r", REPONSE_VIDE],
+        "malformee": ["\x08B2018000000000006a\r"],
+    },
+}
+
+MESURES_CYCLE = {
+    "ungaro/etat/code": 6,
+    "ungaro/etat/nom": "Modulation",
+    "ungaro/erreur/code": 0,
+    "ungaro/erreur/nom": "Non",
+    "ungaro/temperature/fumee": 142,
+    "ungaro/puissance/combustion": 3,
+    "ungaro/temperature/eau": 65,
+    "ungaro/pression/eau": 1.35,
+    "ungaro/temperature/consigne_eau": 65,
+    "ungaro/temperature/exterieure_chaudiere": -2,
+}
+
+
+class FauxClientMQTT:
+    """Client MQTT minimal qui ne fait qu'accepter les publications"""
+    def __init__(self):
+        self.nb_publications = 0
+
+    def publish(self, topic, payload=None, qos=0, retain=False):
+        self.nb_publications += 1
+
+
+def charger_tables():
+    """Charge les tables d'états et d'erreurs depuis le répertoire de l'addon"""
+    for nom_fichier, table in (("etats_chaudiere.json", um.ETATS_CHAUDIERE),
+                               ("erreurs_chaudiere.json", um.ERREURS_CHAUDIERE)):
+        with open(os.path.join(REPERTOIRE_ADDON, nom_fichier), 'r', encoding='utf-8') as f:
+            table.update({int(k): v for k, v in json.load(f).items()})
+
+
+def instantane_cycle():
+    """Construit l'instantané d'un cycle complet, comme interroger_chaudiere()"""
+    instantane = um.InstantaneCycle(1)
+    for topic, valeur in MESURES_CYCLE.items():
+        instantane.ajouter(topic, valeur)
+    instantane.terminer()
+    return instantane
+
+
+def publier_cycle(client, instantane):
+    """Publie un instantané déjà construit, horodatages compris"""
+    # Les horodatages sont formatés à la publication: on les recalcule à chaque appel
+    instantane._horodatages = None
+    um.publier_mesures(client, instantane)
+
+
+def verifier_reponses():
+    """Vérifie que chaque réponse type est décodée comme son libellé l'indique
+
+    Retourne la liste des écarts constatés, vide si tout est conforme.
+    """
+    ecarts = []
+    for nom, categories in REPONSES.items():
+        analyseur = getattr(um, f"analyser_{nom}")
+        attendus = list(categories["valide"])
+        attendus += [(r, None) for r in categories["negative"] + categories["malformee"]]
+        for reponse, attendu in attendus:
+            resultat = analyseur(reponse)
+            # etat/erreur retournent (None, None) pour une réponse rejetée
+            if resultat == (None, None):
+                resultat = None
+            if resultat != attendu:
+                ecarts.append(f"analyser_{nom}({reponse!r}) = {resultat!r}, attendu {attendu!r}")
+    return ecarts
+
+
+def cas_de_mesure():
+    """Retourne les fonctions à mesurer, indexées par nom"""
+    commandes = sorted(um.COMMANDES_INTERROGATION)
+    cas = {
+        "encoder_trame": lambda: [um.encoder_trame(c) for c in commandes],
+    }
+    # Chaque analyseur est mesuré sur un lot de réponses valides, négatives et
+    # malformées: un appel dure plusieurs dizaines de µs et reste mesurable
+    for nom, categories in REPONSES.items():
+        analyseur = getattr(um, f"analyser_{nom}")
+        reponses = [r for r, _ in categories["valide"]] + categories["negative"] + categories["malformee"]
+        lot = reponses * NB_PASSAGES_LOT
+        cas[f"analyser_{nom}"] = lambda a=analyseur, l=lot: [a(r) for r in l]
+    client = FauxClientMQTT()
+    cas["publier_mqtt_discovery"] = lambda: um.publier_mqtt_discovery(client)
+    instantane = instantane_cycle()
+    cas["publier_mesures"] = lambda: publier_cycle(client, instantane)
+    return cas
+
+
+def mesurer(cas):
+    """Retourne le temps médian par appel de chaque cas, en microsecondes
+
+    Les répétitions des différents cas sont entrelacées pour que les
+    variations passagères de la machine se répartissent sur tous les cas.
+    """
+    chronometres = {}
+    for nom, fonction in cas.items():
+        chronometre = timeit.Timer(fonction)
+        nb_appels, duree = chronometre.autorange()
+        chronometres[nom] = (chronometre, max(1, int(nb_appels * DUREE_REPETITION / duree)))
+    durees = {nom: [] for nom in cas}
+    for _ in range(NB_REPETITIONS):
+        for nom, (chronometre, nb_appels) in chronometres.items():
+            durees[nom].append(chronometre.timeit(nb_appels) / nb_appels * 1e6)
+    return {nom: statistics.median(valeurs) for nom, valeurs in durees.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--enregistrer", action="store_true",
+                        help="enregistre les résultats comme nouvelle référence")
+    parser.add_argument("--reference", default=FICHIER_REFERENCE,
+                        help="fichier de référence (défaut: %(default)s)")
+    parser.add_argument("--seuil", type=float, default=SEUIL_REGRESSION,
+                        help="régression tolérée, en fraction (défaut: %(default)s)")
+    parser.add_argument("--ecart-min", type=float, default=ECART_MIN_US,
+                        help="écart absolu minimal en µs pour signaler une régression (défaut: %(default)s)")
+    args = parser.parse_args()
+
+    if not args.enregistrer and not os.path.exists(args.reference):
+        print(f"Référence absente: {args.reference} (lancer avec --enregistrer pour la créer)")
+        return 2
+
+    # Les publications de discovery journalisent à chaque appel
+    logging.getLogger(um.logger.name).setLevel(logging.WARNING)
+    charger_tables()
+
+    ecarts = verifier_reponses()
+    if ecarts:
+        print("Réponses types incohérentes avec leur libellé:")
+        for ecart in ecarts:
+            print(f"  {ecart}")
+        return 3
+
+    resultats = mesurer(cas_de_mesure())
+
+    if args.enregistrer:
+        with open(args.reference, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=2, sort_keys=True)
+        for nom, duree in resultats.items():
+            print(f"{nom:55s} {duree:10.2f} µs")
+        print(f"Référence enregistrée: {args.reference}")
+        return 0
+
+    with open(args.reference, 'r', encoding='utf-8') as f:
+        reference = json.load(f)
+
+    regressions = []
+    for nom, duree in resultats.items():
+        duree_reference = reference.get(nom)
+        if duree_reference is None:
+            print(f"{nom:55s} {duree:10.2f} µs  (nouveau)")
+            continue
+        ecart = duree / duree_reference - 1
+        marqueur = ""
+        if ecart > args.seuil and duree - duree_reference > args.ecart_min:
+            regressions.append(nom)
+            marqueur = "  REGRESSION"
+        print(f"{nom:55s} {duree:10.2f} µs  {ecart:+7.1%}{marqueur}")
+
+    if regressions:
+        print(f"{len(regressions)} régression(s) au-delà de {args.seuil:.0%} et {args.ecart_min} µs: "
+              f"{', '.join(regressions)}")
+        return 1
+    print("Aucune régression")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,10 @@ mqtt_port=$(bashio::config 'mqtt_port')
 mqtt_user=$(bashio::config 'mqtt_user')
 mqtt_password=$(bashio::config 'mqtt_password')
 intervalle_maj=$(bashio::config 'intervalle_maj')
+proxy_actif=$(bashio::config 'proxy_actif')
+proxy_fraicheur=$(bashio::config 'proxy_fraicheur')
+delai_trame_min=$(bashio::config 'delai_trame_min')
+delai_trame_max=$(bashio::config 'delai_trame_max')
 
 bashio::log.info "Démarrage Ungaro CTU A2 24"
 bashio::log.info "Chaudière: ${adresse_ip}:${port_tcp}"
@@ -22,6 +26,10 @@ export MQTT_PORT="${mqtt_port}"
 export MQTT_USER="${mqtt_user}"
 export MQTT_PASSWORD="${mqtt_password}"
 export INTERVALLE_MAJ="${intervalle_maj}"
+export PROXY_ACTIF="${proxy_actif}"
+export PROXY_FRAICHEUR="${proxy_fraicheur}"
+export DELAI_TRAME_MIN="${delai_trame_min}"
+export DELAI_TRAME_MAX="${delai_trame_max}"
 
 # Lancement du script Python
 cd /app
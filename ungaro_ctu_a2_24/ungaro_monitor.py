@@ -1,5 +1,11 @@
+import collections
+import glob
 import socket
+import socketserver
+import sys
+import threading
 import time
+import tracemalloc
 import json
 import os
 from datetime import datetime
@@ -14,6 +20,53 @@ logger = logging.getLogger("Ungaro CTU A2 24")
 MAX_RECONNECT_ATTEMPTS = 10
 RECONNECT_DELAY_BASE = 2
 
+# Port d'écoute du proxy TCP multiplexé (même format de trame que le bridge)
+PORT_PROXY = 8898
+# Taille maximale d'une trame incomplète reçue d'un client du proxy
+TAILLE_MAX_TAMPON_PROXY = 1024
+# Trame vide renvoyée à un client du proxy quand le bridge n'a pas répondu
+REPONSE_ECHEC_PROXY = b'\x08\r'
+
+# Préfixes des commandes qui modifient la chaudière (consigne, marche, arrêt, RAZ erreur)
+PREFIXES_COMMANDES_ECRITURE = ("B2018", "J3025")
+
+# Commandes d'interrogation pouvant être servies depuis le cache par le proxy
+COMMANDES_INTERROGATION = {
+    "I30001000000000000",
+    "I30002000000000000",
+    "I30005000000000000",
+    "I30011000000000000",
+    "I30017000000000000",
+    "I30020000000000000",
+    "A20180000000000000",
+    "J30044000000000000",
+}
+
+# Constantes du régulateur de cadence (AIMD) entre deux trames
+DELAI_TRAME_DEFAUT = 1.0
+PAS_DIMINUTION_DELAI = 0.05
+FACTEUR_AUGMENTATION_DELAI = 2.0
+# Délai de départ d'une augmentation quand le délai courant est nul
+DELAI_AUGMENTATION_MIN = 0.1
+# Un temps de réponse est dégradé s'il dépasse RTT lissé + 4 x variation (comme TCP)
+FACTEUR_VARIATION_RTT = 4
+RTT_DEGRADE_MIN = 0.1
+
+# Chaque capteur lit sa valeur et ses métadonnées (horodatage, cycle) dans un
+# même message JSON publié sur <topic>/mesure
+TEMPLATE_VALEUR_MESURE = "{{ value_json.valeur }}"
+TEMPLATE_ATTRIBUTS_MESURE = ("{{ {'horodatage': value_json.horodatage, 'sequence': value_json.sequence, "
+                             "'origine': value_json.origine} | tojson }}")
+
+# Constantes des diagnostics à la demande (profil CPU, mémoire)
+REPERTOIRE_DIAGNOSTIC = '/data'
+DUREE_DIAGNOSTIC_DEFAUT = 60
+DUREE_DIAGNOSTIC_MAX = 600
+INTERVALLE_ECHANTILLONNAGE_CPU = 0.01
+PROFONDEUR_PILE_TRACEMALLOC = 10
+NB_LIGNES_RESUME_DIAGNOSTIC = 10
+NB_FICHIERS_DIAGNOSTIC_MAX = 3
+
 def charger_etats_chaudiere():
     """Charge les états depuis le fichier JSON"""
     try:
@@ -48,24 +101,239 @@ DEVICE_INFO = {
     "model": "CTU A2 24"
 }
 
+class VerrouEquitable:
+    """Verrou FIFO: les demandeurs accèdent au bridge dans leur ordre d'arrivée"""
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._ticket_suivant = 0
+        self._ticket_servi = 0
+
+    def __enter__(self):
+        with self._condition:
+            ticket = self._ticket_suivant
+            self._ticket_suivant += 1
+            while ticket != self._ticket_servi:
+                self._condition.wait()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self._condition:
+            self._ticket_servi += 1
+            self._condition.notify_all()
+        return False
+
+# Le bridge ne gère qu'un client à la fois: boucle principale, commandes MQTT
+# et clients du proxy passent tous par ce verrou
+verrou_bridge = VerrouEquitable()
+
+# Dernières réponses brutes aux commandes d'interrogation: commande -> (réponse, instant)
+cache_reponses = {}
+verrou_cache = threading.Lock()
+
+def memoriser_reponse(commande, reponse):
+    """Met à jour le cache après un échange avec le bridge
+
+    Appelée par echanger_trame() sous verrou_bridge, pour qu'une écriture ne
+    puisse pas s'intercaler entre une lecture et sa mise en cache. La réponse
+    d'une commande d'interrogation est mémorisée. Une commande d'écriture
+    (consigne, marche, arrêt, RAZ) vide le cache, que le bridge ait répondu
+    ou non. Les autres commandes ne touchent pas au cache.
+    """
+    with verrou_cache:
+        if commande.startswith(PREFIXES_COMMANDES_ECRITURE):
+            cache_reponses.clear()
+        elif reponse and commande in COMMANDES_INTERROGATION:
+            cache_reponses[commande] = (reponse, time.monotonic())
+
+def lire_cache(commande, fraicheur):
+    """Retourne la réponse mémorisée si elle date de moins de `fraicheur` secondes"""
+    with verrou_cache:
+        entree = cache_reponses.get(commande)
+    if entree and time.monotonic() - entree[1] <= fraicheur:
+        return entree[0]
+    return None
+
+class RegulateurCadence:
+    """Espacement adaptatif (AIMD) entre deux trames envoyées au bridge
+
+    Chaque échange réussi avec un temps de réponse normal réduit le délai d'un
+    pas fixe; un échec ou un temps de réponse dégradé le multiplie. Le délai
+    reste borné par [delai_min, delai_max].
+
+    Le temps de réponse lissé et sa variation suivent le calcul de TCP
+    (RFC 6298): une réponse n'est jugée dégradée que si elle dépasse à la fois
+    RTT_DEGRADE_MIN et le RTT lissé augmenté de FACTEUR_VARIATION_RTT fois la
+    variation, afin que la gigue normale du réseau ne ralentisse pas la cadence.
+    """
+    def __init__(self, delai_min, delai_max):
+        self.configurer(delai_min, delai_max)
+        self.rtt_lisse = None
+        self.rtt_variation = None
+        self.taux_erreur = 0.0
+        self.nb_succes = 0
+        self.nb_echecs = 0
+        self._fin_derniere_trame = 0.0
+
+    def configurer(self, delai_min, delai_max):
+        self.delai_min = delai_min
+        self.delai_max = max(delai_min, delai_max)
+        self.delai = min(max(DELAI_TRAME_DEFAUT, self.delai_min), self.delai_max)
+
+    def attendre(self):
+        """Attend que le délai depuis la dernière trame soit écoulé"""
+        attente = self._fin_derniere_trame + self.delai - time.monotonic()
+        if attente > 0:
+            time.sleep(attente)
+
+    def enregistrer_succes(self, rtt):
+        self.nb_succes += 1
+        self.taux_erreur *= 0.9
+        if self.rtt_lisse is None:
+            degrade = False
+            self.rtt_lisse = rtt
+            self.rtt_variation = rtt / 2
+        else:
+            seuil = max(RTT_DEGRADE_MIN, self.rtt_lisse + FACTEUR_VARIATION_RTT * self.rtt_variation)
+            degrade = rtt > seuil
+            self.rtt_variation = 0.75 * self.rtt_variation + 0.25 * abs(self.rtt_lisse - rtt)
+            self.rtt_lisse = 0.875 * self.rtt_lisse + 0.125 * rtt
+        if degrade:
+            self._augmenter(f"temps de réponse dégradé ({rtt * 1000:.0f} ms)")
+        else:
+            self._modifier_delai(self.delai - PAS_DIMINUTION_DELAI)
+        self._fin_derniere_trame = time.monotonic()
+
+    def enregistrer_echec(self, motif):
+        self.nb_echecs += 1
+        self.taux_erreur = 0.9 * self.taux_erreur + 0.1
+        self._augmenter(motif)
+        self._fin_derniere_trame = time.monotonic()
+
+    def _augmenter(self, motif):
+        ancien_delai = self.delai
+        self._modifier_delai(max(self.delai, DELAI_AUGMENTATION_MIN) * FACTEUR_AUGMENTATION_DELAI)
+        if self.delai != ancien_delai:
+            logger.info(f"Cadence bridge: délai {ancien_delai:.2f}s -> {self.delai:.2f}s ({motif})")
+
+    def _modifier_delai(self, delai):
+        delai = min(max(delai, self.delai_min), self.delai_max)
+        if delai != self.delai:
+            logger.debug(f"Cadence bridge: délai {self.delai:.2f}s -> {delai:.2f}s")
+            self.delai = delai
+
+    def statistiques(self):
+        return {
+            "delai": round(self.delai, 3),
+            "rtt_ms": round(self.rtt_lisse * 1000, 1) if self.rtt_lisse is not None else None,
+            "rtt_variation_ms": round(self.rtt_variation * 1000, 1) if self.rtt_variation is not None else None,
+            "taux_erreur": round(self.taux_erreur, 3),
+            "succes": self.nb_succes,
+            "echecs": self.nb_echecs
+        }
+
+# Régulateur partagé, reconfiguré dans main() depuis les options de l'addon
+regulateur_cadence = RegulateurCadence(0.2, 5.0)
+
+def encoder_trame(commande):
+    """Encode une commande au format du bridge: 08 + commande_hex + 0d"""
+    commande_hex = ''.join(f"{ord(c):02x}" for c in commande)
+    trame_complete = f"08{commande_hex}0d"
+    return bytes.fromhex(trame_complete)
+
+def echanger_trame(adresse, port, commande):
+    """Envoie une commande au bridge et retourne la réponse brute"""
+    trame = encoder_trame(commande)
+    with verrou_bridge:
+        regulateur_cadence.attendre()
+        debut = time.monotonic()
+        reponse = None
+        try:
+            with socket.create_connection((adresse, port), timeout=5) as sock:
+                sock.sendall(trame)
+                reponse = sock.recv(1024)
+        except Exception as e:
+            regulateur_cadence.enregistrer_echec(str(e))
+            raise
+        finally:
+            memoriser_reponse(commande, reponse)
+        if reponse:
+            regulateur_cadence.enregistrer_succes(time.monotonic() - debut)
+        else:
+            regulateur_cadence.enregistrer_echec("réponse vide")
+        return reponse
+
 def envoyer_commande_tcp(adresse, port, commande):
     """Envoie une commande TCP à la chaudière"""
     try:
-        with socket.create_connection((adresse, port), timeout=5) as sock:
-            # Format: 08 + commande_hex + 0d
-            commande_hex = ''.join(f"{ord(c):02x}" for c in commande)
-            trame_complete = f"08{commande_hex}0d"
-            sock.sendall(bytes.fromhex(trame_complete))
-            
-            reponse = sock.recv(1024)
-            if reponse:
-                reponse_str = reponse.decode(errors='ignore').strip('\x08\r\n')
-                logger.debug(f"TCP {adresse}:{port} - {commande} -> {reponse_str}")
-                return reponse_str
+        reponse = echanger_trame(adresse, port, commande)
+        if reponse:
+            reponse_str = reponse.decode(errors='ignore').strip('\x08\r\n')
+            logger.debug(f"TCP {adresse}:{port} - {commande} -> {reponse_str}")
+            return reponse_str
     except Exception as e:
         logger.error(f"Erreur TCP {adresse}:{port}: {e}")
         return None
 
+class GestionnaireProxy(socketserver.BaseRequestHandler):
+    """Relaie les trames 08…0d d'un client du proxy vers le bridge"""
+    def handle(self):
+        client_proxy = f"{self.client_address[0]}:{self.client_address[1]}"
+        logger.info(f"Proxy: client connecté {client_proxy}")
+        tampon = b''
+        try:
+            while True:
+                donnees = self.request.recv(1024)
+                if not donnees:
+                    break
+                tampon += donnees
+                # Une trame se termine par 0d
+                while b'\r' in tampon:
+                    trame, tampon = tampon.split(b'\r', 1)
+                    commande = trame.decode(errors='ignore').strip('\x08\r\n')
+                    if commande:
+                        self.request.sendall(self.traiter_trame(client_proxy, commande))
+                if len(tampon) > TAILLE_MAX_TAMPON_PROXY:
+                    logger.warning(f"Proxy {client_proxy}: trame sans fin de plus de "
+                                   f"{TAILLE_MAX_TAMPON_PROXY} octets, connexion fermée")
+                    break
+        except Exception as e:
+            logger.error(f"Erreur proxy {client_proxy}: {e}")
+        logger.info(f"Proxy: client déconnecté {client_proxy}")
+
+    def traiter_trame(self, client_proxy, commande):
+        """Retourne la réponse à renvoyer au client pour une commande
+
+        Un échec du bridge n'interrompt pas la session du client: il reçoit
+        une trame vide et peut renvoyer sa commande.
+        """
+        serveur = self.server
+        reponse = lire_cache(commande, serveur.fraicheur)
+        if reponse:
+            logger.debug(f"Proxy {client_proxy} - {commande} servie depuis le cache")
+            return reponse
+        try:
+            reponse = echanger_trame(serveur.adresse_chaudiere, serveur.port_chaudiere, commande)
+        except Exception as e:
+            logger.warning(f"Proxy {client_proxy} - {commande}: erreur bridge: {e}")
+        if not reponse:
+            logger.warning(f"Proxy {client_proxy} - {commande}: pas de réponse du bridge")
+            return REPONSE_ECHEC_PROXY
+        return reponse
+
+class ServeurProxy(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+def demarrer_proxy(adresse, port, fraicheur):
+    """Démarre le proxy TCP multiplexé dans un thread dédié"""
+    serveur = ServeurProxy(("", PORT_PROXY), GestionnaireProxy)
+    serveur.adresse_chaudiere = adresse
+    serveur.port_chaudiere = port
+    serveur.fraicheur = fraicheur
+    threading.Thread(target=serveur.serve_forever, name="proxy", daemon=True).start()
+    logger.info(f"Proxy TCP démarré sur le port {PORT_PROXY} (fraîcheur cache: {fraicheur}s)")
+    return serveur
+
 def analyser_etat_chaudiere(reponse):
     """Analyse la réponse pour extraire l'état de la chaudière"""
     if not reponse:
@@ -209,13 +477,162 @@ def analyser_temperature_consigne_eau(reponse):
     
     return None
 
+class InstantaneCycle:
+    """Valeurs d'un cycle d'interrogation avec leur instant d'échantillonnage
+
+    Les instants sont relevés sur l'horloge monotone à la réception de chaque
+    réponse, puis convertis en heure murale à partir d'une référence prise au
+    début du cycle: les écarts entre registres restent exacts même si
+    l'horloge système est ajustée pendant le cycle.
+    """
+    def __init__(self, sequence):
+        self.sequence = sequence
+        self._origine_murale = time.time()
+        self._origine_monotone = time.monotonic()
+        self._fuseau = datetime.fromtimestamp(self._origine_murale).astimezone().tzinfo
+        self.debut = self._origine_monotone
+        self.fin = None
+        self.mesures = {}  # topic -> (valeur, instant monotone)
+        self._horodatages = None
+
+    def ajouter(self, topic, valeur):
+        self.mesures[topic] = (valeur, time.monotonic())
+
+    def terminer(self):
+        self.fin = time.monotonic()
+
+    def horodatage(self, instant):
+        """Convertit un instant monotone en horodatage ISO 8601 local"""
+        seconde_murale = self._origine_murale + (instant - self._origine_monotone)
+        return datetime.fromtimestamp(seconde_murale, self._fuseau).isoformat(timespec='milliseconds')
+
+    def horodatages(self):
+        """Retourne l'horodatage de chaque mesure, calculé une seule fois"""
+        if self._horodatages is None:
+            self._horodatages = {topic: self.horodatage(instant)
+                                 for topic, (valeur, instant) in self.mesures.items()}
+        return self._horodatages
+
+    def vers_dict(self):
+        fin = self.fin if self.fin is not None else time.monotonic()
+        horodatages = self.horodatages()
+        return {
+            "sequence": self.sequence,
+            "debut": self.horodatage(self.debut),
+            "fin": self.horodatage(fin),
+            "mesures": {
+                topic: {"valeur": valeur, "horodatage": horodatages[topic]}
+                for topic, (valeur, instant) in self.mesures.items()
+            }
+        }
+
+def interroger_chaudiere(adresse, port, sequence):
+    """Interroge tous les registres et retourne l'instantané du cycle"""
+    instantane = InstantaneCycle(sequence)
+    
+    # Interroger l'état de la chaudière
+    code_etat, nom_etat = analyser_etat_chaudiere(
+        envoyer_commande_tcp(adresse, port, "I30001000000000000"))
+    if code_etat is not None:
+        logger.info(f"État chaudière: {code_etat} - {nom_etat}")
+        instantane.ajouter("ungaro/etat/code", code_etat)
+        instantane.ajouter("ungaro/etat/nom", nom_etat)
+    
+    # Interroger les erreurs de la chaudière
+    code_erreur, nom_erreur = analyser_erreur_chaudiere(
+        envoyer_commande_tcp(adresse, port, "I30002000000000000"))
+    if code_erreur is not None:
+        if code_erreur != 0:  # Afficher seulement si erreur
+            logger.warning(f"Erreur chaudière: {code_erreur} - {nom_erreur}")
+        instantane.ajouter("ungaro/erreur/code", code_erreur)
+        instantane.ajouter("ungaro/erreur/nom", nom_erreur)
+    
+    # Interroger la température de fumée
+    temperature_fumee = analyser_temperature_fumee(
+        envoyer_commande_tcp(adresse, port, "I30005000000000000"))
+    if temperature_fumee is not None:
+        logger.info(f"Température fumée: {temperature_fumee}°C")
+        instantane.ajouter("ungaro/temperature/fumee", temperature_fumee)
+    
+    # Interroger la puissance de combustion
+    puissance_combustion = analyser_puissance_combustion(
+        envoyer_commande_tcp(adresse, port, "I30011000000000000"))
+    if puissance_combustion is not None:
+        logger.info(f"Puissance combustion: {puissance_combustion}")
+        instantane.ajouter("ungaro/puissance/combustion", puissance_combustion)
+    
+    # Interroger la température de l'eau
+    temperature_eau = analyser_temperature_eau(
+        envoyer_commande_tcp(adresse, port, "I30017000000000000"))
+    if temperature_eau is not None:
+        logger.info(f"Température eau: {temperature_eau}°C")
+        instantane.ajouter("ungaro/temperature/eau", temperature_eau)
+    
+    # Interroger la pression de l'eau
+    pression_eau = analyser_pression_eau(
+        envoyer_commande_tcp(adresse, port, "I30020000000000000"))
+    if pression_eau is not None:
+        logger.info(f"Pression eau: {pression_eau} bar")
+        instantane.ajouter("ungaro/pression/eau", pression_eau)
+    
+    # Interroger la température de consigne de l'eau
+    temperature_consigne_eau = analyser_temperature_consigne_eau(
+        envoyer_commande_tcp(adresse, port, "A20180000000000000"))
+    if temperature_consigne_eau is not None:
+        logger.info(f"Température consigne eau: {temperature_consigne_eau}°C")
+        instantane.ajouter("ungaro/temperature/consigne_eau", temperature_consigne_eau)
+    
+    # Interroger la température extérieure mesurée par la chaudière
+    temperature_exterieure_chaudiere = analyser_temperature_exterieure_chaudiere(
+        envoyer_commande_tcp(adresse, port, "J30044000000000000"))
+    if temperature_exterieure_chaudiere is not None:
+        logger.info(f"Température extérieure chaudière: {temperature_exterieure_chaudiere}°C")
+        instantane.ajouter("ungaro/temperature/exterieure_chaudiere", temperature_exterieure_chaudiere)
+    
+    instantane.terminer()
+    return instantane
+
+def message_mesure(valeur, horodatage, sequence, origine):
+    """Construit le message JSON <topic>/mesure: valeur et métadonnées ensemble"""
+    return json.dumps({
+        "valeur": valeur,
+        "horodatage": horodatage,
+        "sequence": sequence,
+        "origine": origine
+    })
+
+def publier_mesures(client, instantane):
+    """Publie les valeurs d'un cycle d'interrogation et leurs horodatages sur MQTT
+
+    Les capteurs HA lisent <topic>/mesure, où valeur et horodatage arrivent
+    dans un seul message. Le topic nu reste publié pour l'entité de réglage
+    de consigne et les automatisations existantes.
+    """
+    global cycle_publie
+    horodatages = instantane.horodatages()
+    for topic, (valeur, instant) in instantane.mesures.items():
+        try:
+            client.publish(f"{topic}/mesure", message_mesure(valeur, horodatages[topic],
+                                                             instantane.sequence, "cycle"), retain=True)
+            client.publish(topic, str(valeur), retain=True)
+        except Exception as e:
+            logger.error(f"Erreur publication MQTT {topic}: {e}")
+    cycle_publie = True
+    try:
+        client.publish("ungaro/cycle", json.dumps(instantane.vers_dict()), retain=True)
+    except Exception as e:
+        logger.error(f"Erreur publication MQTT cycle: {e}")
+
 def publier_mqtt_discovery(client):
     """Publie la configuration MQTT Discovery"""
     
     # Capteur état numérique
     config_etat_num = {
         "name": "État Chaudière (Code)",
-        "state_topic": "ungaro/etat/code",
+        "state_topic": "ungaro/etat/code/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/etat/code/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_etat_code",
         "icon": "mdi:fire",
         "device": DEVICE_INFO
@@ -224,7 +641,10 @@ def publier_mqtt_discovery(client):
     # Capteur état textuel
     config_etat_nom = {
         "name": "État Chaudière",
-        "state_topic": "ungaro/etat/nom", 
+        "state_topic": "ungaro/etat/nom/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/etat/nom/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_etat_nom",
         "icon": "mdi:information",
         "device": DEVICE_INFO
@@ -233,7 +653,10 @@ def publier_mqtt_discovery(client):
     # Capteur erreur numérique
     config_erreur_num = {
         "name": "Erreur Chaudière (Code)",
-        "state_topic": "ungaro/erreur/code",
+        "state_topic": "ungaro/erreur/code/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/erreur/code/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_erreur_code",
         "icon": "mdi:alert-circle",
         "device": DEVICE_INFO
@@ -242,7 +665,10 @@ def publier_mqtt_discovery(client):
     # Capteur erreur textuel
     config_erreur_nom = {
         "name": "Erreur Chaudière",
-        "state_topic": "ungaro/erreur/nom", 
+        "state_topic": "ungaro/erreur/nom/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/erreur/nom/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_erreur_nom",
         "icon": "mdi:alert-circle-outline",
         "device": DEVICE_INFO
@@ -251,7 +677,10 @@ def publier_mqtt_discovery(client):
     # Capteur température fumée
     config_temp_fumee = {
         "name": "Température Fumée",
-        "state_topic": "ungaro/temperature/fumee",
+        "state_topic": "ungaro/temperature/fumee/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/temperature/fumee/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_temperature_fumee",
         "unit_of_measurement": "°C",
         "device_class": "temperature",
@@ -262,7 +691,10 @@ def publier_mqtt_discovery(client):
     # Capteur puissance combustion
     config_puissance = {
         "name": "Puissance Combustion",
-        "state_topic": "ungaro/puissance/combustion",
+        "state_topic": "ungaro/puissance/combustion/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/puissance/combustion/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_puissance_combustion",
         "icon": "mdi:fire",
         "device": DEVICE_INFO
@@ -271,7 +703,10 @@ def publier_mqtt_discovery(client):
     # Capteur température eau
     config_temp_eau = {
         "name": "Température Eau",
-        "state_topic": "ungaro/temperature/eau",
+        "state_topic": "ungaro/temperature/eau/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/temperature/eau/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_temperature_eau",
         "unit_of_measurement": "°C",
         "device_class": "temperature",
@@ -282,7 +717,10 @@ def publier_mqtt_discovery(client):
     # Capteur température extérieure chaudière
     config_temp_ext_chaudiere = {
         "name": "Température Extérieure Chaudière",
-        "state_topic": "ungaro/temperature/exterieure_chaudiere",
+        "state_topic": "ungaro/temperature/exterieure_chaudiere/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/temperature/exterieure_chaudiere/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_temperature_exterieure_chaudiere",
         "unit_of_measurement": "°C",
         "device_class": "temperature",
@@ -293,7 +731,10 @@ def publier_mqtt_discovery(client):
     # Capteur pression eau
     config_pression_eau = {
         "name": "Pression Eau",
-        "state_topic": "ungaro/pression/eau",
+        "state_topic": "ungaro/pression/eau/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/pression/eau/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_pression_eau",
         "unit_of_measurement": "bar",
         "device_class": "pressure",
@@ -304,7 +745,10 @@ def publier_mqtt_discovery(client):
     # Capteur température consigne eau
     config_temp_consigne_eau = {
         "name": "Température Consigne Eau",
-        "state_topic": "ungaro/temperature/consigne_eau",
+        "state_topic": "ungaro/temperature/consigne_eau/mesure",
+        "value_template": TEMPLATE_VALEUR_MESURE,
+        "json_attributes_topic": "ungaro/temperature/consigne_eau/mesure",
+        "json_attributes_template": TEMPLATE_ATTRIBUTS_MESURE,
         "unique_id": "ungaro_temperature_consigne_eau",
         "unit_of_measurement": "°C",
         "device_class": "temperature",
@@ -345,6 +789,19 @@ def publier_mqtt_discovery(client):
         "device": DEVICE_INFO
     }
     
+    # Capteur délai entre trames (régulateur de cadence)
+    config_delai_trame = {
+        "name": "Délai Entre Trames",
+        "state_topic": "ungaro/transport/statistiques",
+        "value_template": "{{ value_json.delai }}",
+        "json_attributes_topic": "ungaro/transport/statistiques",
+        "unique_id": "ungaro_transport_delai_trame",
+        "unit_of_measurement": "s",
+        "entity_category": "diagnostic",
+        "icon": "mdi:timer-sync",
+        "device": DEVICE_INFO
+    }
+    
     # Bouton RAZ erreur
     config_bouton_raz = {
         "name": "RAZ Code Erreur",
@@ -376,6 +833,8 @@ def publier_mqtt_discovery(client):
                       json.dumps(config_temp_consigne_eau), retain=True)
         client.publish("homeassistant/sensor/ungaro_temperature_exterieure_chaudiere/config", 
                       json.dumps(config_temp_ext_chaudiere), retain=True)
+        client.publish("homeassistant/sensor/ungaro_transport_delai_trame/config", 
+                      json.dumps(config_delai_trame), retain=True)
         client.publish("homeassistant/number/ungaro_control_temperature_consigne_eau/config", 
                       json.dumps(config_control_temp_consigne), retain=True)
         client.publish("homeassistant/button/ungaro_bouton_marche/config", 
@@ -385,25 +844,253 @@ def publier_mqtt_discovery(client):
         client.publish("homeassistant/button/ungaro_bouton_raz_erreur/config", 
                       json.dumps(config_bouton_raz), retain=True)
         
-        # États initiaux
-        client.publish("ungaro/etat/code", "0", retain=True)
-        client.publish("ungaro/etat/nom", "Eteinte", retain=True)
-        client.publish("ungaro/erreur/code", "0", retain=True)
-        client.publish("ungaro/erreur/nom", "Non", retain=True)
-        client.publish("ungaro/temperature/fumee", "0", retain=True)
-        client.publish("ungaro/puissance/combustion", "0", retain=True)
-        client.publish("ungaro/temperature/eau", "0", retain=True)
-        client.publish("ungaro/pression/eau", "0", retain=True)
-        client.publish("ungaro/temperature/consigne_eau", "0", retain=True)
-        client.publish("ungaro/temperature/exterieure_chaudiere", "0", retain=True)
+        # États initiaux, uniquement tant qu'aucun cycle n'a été publié: à chaque
+        # retour en ligne de HA, ils écraseraient les dernières valeurs lues
+        if not cycle_publie:
+            client.publish("ungaro/etat/code", "0", retain=True)
+            client.publish("ungaro/etat/nom", "Eteinte", retain=True)
+            client.publish("ungaro/erreur/code", "0", retain=True)
+            client.publish("ungaro/erreur/nom", "Non", retain=True)
+            client.publish("ungaro/temperature/fumee", "0", retain=True)
+            client.publish("ungaro/puissance/combustion", "0", retain=True)
+            client.publish("ungaro/temperature/eau", "0", retain=True)
+            client.publish("ungaro/pression/eau", "0", retain=True)
+            client.publish("ungaro/temperature/consigne_eau", "0", retain=True)
+            client.publish("ungaro/temperature/exterieure_chaudiere", "0", retain=True)
         
         logger.info("MQTT Discovery configuré")
         
     except Exception as e:
         logger.error(f"Erreur configuration MQTT Discovery: {e}")
 
+# Événement d'arrêt du diagnostic en cours (None si aucun diagnostic actif)
+arret_diagnostic = None
+
+def lire_rss_ko():
+    """Retourne la mémoire résidente du processus en ko (Linux uniquement)"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for ligne in f:
+                if ligne.startswith('VmRSS:'):
+                    return int(ligne.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def nom_fichier_diagnostic(mode, extension):
+    horodatage = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return os.path.join(REPERTOIRE_DIAGNOSTIC, f"diagnostic_{mode}_{horodatage}.{extension}")
+
+def purger_fichiers_diagnostic(mode):
+    """Ne conserve que les NB_FICHIERS_DIAGNOSTIC_MAX derniers fichiers d'un mode"""
+    fichiers = sorted(glob.glob(os.path.join(REPERTOIRE_DIAGNOSTIC, f"diagnostic_{mode}_*")))
+    for fichier in fichiers[:-NB_FICHIERS_DIAGNOSTIC_MAX]:
+        try:
+            os.remove(fichier)
+        except OSError as e:
+            logger.warning(f"Suppression impossible de {fichier}: {e}")
+
+def temps_cpu_thread(id_natif):
+    """Retourne le temps CPU consommé par un thread en secondes, None si indisponible
+
+    Lu dans /proc à partir de l'identifiant noyau (Thread.native_id): un
+    thread terminé entre-temps donne simplement un fichier absent.
+    """
+    repertoire = f"/proc/self/task/{id_natif}"
+    try:
+        # schedstat: temps CPU en ns, plus précis que stat
+        with open(f"{repertoire}/schedstat", 'r') as f:
+            return int(f.read().split()[0]) / 1e9
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        # stat: utime et stime en ticks, après le nom du thread entre parenthèses
+        with open(f"{repertoire}/stat", 'r') as f:
+            champs = f.read().rsplit(')', 1)[1].split()
+        return (int(champs[11]) + int(champs[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def profiler_cpu(duree, arret):
+    """Échantillonne les piles de tous les threads pendant `duree` secondes
+    
+    Chaque pile est pondérée par le temps CPU consommé par son thread depuis
+    l'échantillon précédent: les threads en attente (sleep, select, wait...)
+    n'apparaissent pas. Les piles sont écrites au format « folded »
+    (flamegraph.pl, speedscope), en µs CPU, et le résumé liste les fonctions
+    les plus consommatrices. Le temps CPU de l'échantillonneur lui-même est
+    déduit de la charge indiquée.
+    """
+    ident_profileur = threading.get_ident()
+    piles = collections.Counter()
+    fonctions = collections.Counter()
+    cpu_threads = {}
+    ponderation_cpu = temps_cpu_thread(threading.get_native_id()) is not None
+    nb_echantillons = 0
+    debut = time.monotonic()
+    debut_cpu = time.process_time()
+    debut_cpu_profileur = time.thread_time()
+    while not arret.is_set() and time.monotonic() - debut < duree:
+        threads = {t.ident: t for t in threading.enumerate()}
+        # Reconstruit à chaque tour: les threads terminés en disparaissent
+        cpu_courants = {}
+        for ident, frame in sys._current_frames().items():
+            if ident == ident_profileur:
+                continue
+            thread = threads.get(ident)
+            if ponderation_cpu:
+                id_natif = thread.native_id if thread is not None else None
+                if id_natif is None:
+                    continue
+                cpu = temps_cpu_thread(id_natif)
+                if cpu is None:
+                    continue
+                cpu_courants[id_natif] = cpu
+                cpu_precedent = cpu_threads.get(id_natif)
+                if cpu_precedent is None:
+                    continue
+                poids = int((cpu - cpu_precedent) * 1e6)
+            else:
+                poids = 1
+            if poids <= 0:
+                continue
+            pile = []
+            while frame is not None:
+                code = frame.f_code
+                pile.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if not pile:
+                continue
+            fonctions[pile[0]] += poids
+            pile.append(thread.name if thread is not None else str(ident))
+            piles[';'.join(reversed(pile))] += poids
+        cpu_threads = cpu_courants
+        nb_echantillons += 1
+        arret.wait(INTERVALLE_ECHANTILLONNAGE_CPU)
+    duree_reelle = time.monotonic() - debut
+    temps_cpu_profileur = time.thread_time() - debut_cpu_profileur
+    temps_cpu = time.process_time() - debut_cpu - temps_cpu_profileur
+    
+    chemin = nom_fichier_diagnostic('cpu', 'folded')
+    with open(chemin, 'w', encoding='utf-8') as f:
+        for pile, poids in piles.most_common():
+            f.write(f"{pile} {poids}\n")
+    purger_fichiers_diagnostic('cpu')
+    
+    total = sum(fonctions.values()) or 1
+    return {
+        "mode": "cpu",
+        "fichier": chemin,
+        "duree": round(duree_reelle, 1),
+        "echantillons": nb_echantillons,
+        "ponderation": "temps_cpu" if ponderation_cpu else "echantillons",
+        "cpu_pourcent": round(100 * max(temps_cpu, 0) / duree_reelle, 1) if duree_reelle else None,
+        "cpu_profileur_pourcent": round(100 * temps_cpu_profileur / duree_reelle, 1) if duree_reelle else None,
+        "fonctions": [
+            {"fonction": fonction, "pourcent": round(100 * poids / total, 1)}
+            for fonction, poids in fonctions.most_common(NB_LIGNES_RESUME_DIAGNOSTIC)
+        ]
+    }
+
+def tracer_memoire(duree, arret):
+    """Trace les allocations pendant `duree` secondes puis enregistre un instantané tracemalloc"""
+    rss_debut = lire_rss_ko()
+    deja_actif = tracemalloc.is_tracing()
+    if not deja_actif:
+        tracemalloc.start(PROFONDEUR_PILE_TRACEMALLOC)
+    try:
+        debut = time.monotonic()
+        arret.wait(duree)
+        duree_reelle = time.monotonic() - debut
+        instantane = tracemalloc.take_snapshot()
+        courant, pic = tracemalloc.get_traced_memory()
+    finally:
+        if not deja_actif:
+            tracemalloc.stop()
+    
+    instantane = instantane.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+    chemin = nom_fichier_diagnostic('memoire', 'snapshot')
+    instantane.dump(chemin)
+    purger_fichiers_diagnostic('memoire')
+    
+    return {
+        "mode": "memoire",
+        "fichier": chemin,
+        "duree": round(duree_reelle, 1),
+        "allocations_ko": round(courant / 1024, 1),
+        "pic_ko": round(pic / 1024, 1),
+        "rss_debut_ko": rss_debut,
+        "rss_fin_ko": lire_rss_ko(),
+        "lignes": [
+            {"ligne": str(statistique.traceback[0]), "ko": round(statistique.size / 1024, 1),
+             "blocs": statistique.count}
+            for statistique in instantane.statistics('lineno')[:NB_LIGNES_RESUME_DIAGNOSTIC]
+        ]
+    }
+
+def executer_diagnostic(client, fonction, duree, arret):
+    """Exécute un diagnostic dans son thread et publie le résumé sur MQTT"""
+    global arret_diagnostic
+    try:
+        resume = fonction(duree, arret)
+        logger.info(f"Diagnostic {resume['mode']} terminé: {resume['fichier']}")
+    except Exception as e:
+        logger.error(f"Erreur diagnostic: {e}")
+        resume = {"erreur": str(e)}
+    finally:
+        arret_diagnostic = None
+    try:
+        client.publish("ungaro/diagnostic/resultat", json.dumps(resume))
+    except Exception as e:
+        logger.error(f"Erreur publication MQTT diagnostic: {e}")
+
+def traiter_commande_diagnostic(client, payload):
+    """Démarre ou arrête un diagnostic
+    
+    Payload accepté: "cpu", "memoire", "stop" ou un objet JSON
+    {"mode": "cpu" | "memoire", "duree": secondes}.
+    """
+    global arret_diagnostic
+    try:
+        commande = json.loads(payload)
+    except ValueError:
+        commande = payload.strip()
+    if not isinstance(commande, dict):
+        commande = {"mode": str(commande)}
+    mode = commande.get("mode")
+    
+    if mode == "stop":
+        if arret_diagnostic is not None:
+            arret_diagnostic.set()
+            logger.info("Arrêt du diagnostic demandé")
+        return
+    
+    fonctions = {"cpu": profiler_cpu, "memoire": tracer_memoire}
+    if mode not in fonctions:
+        logger.warning(f"Mode de diagnostic inconnu: {mode}")
+        return
+    if arret_diagnostic is not None:
+        logger.warning("Un diagnostic est déjà en cours")
+        return
+    try:
+        duree = float(commande.get("duree", DUREE_DIAGNOSTIC_DEFAUT))
+    except (TypeError, ValueError):
+        logger.warning(f"Durée de diagnostic invalide: {commande.get('duree')}")
+        return
+    duree = min(max(duree, 1), DUREE_DIAGNOSTIC_MAX)
+    
+    arret_diagnostic = threading.Event()
+    logger.info(f"Diagnostic {mode} démarré pour {duree:.0f}s")
+    threading.Thread(target=executer_diagnostic, args=(client, fonctions[mode], duree, arret_diagnostic),
+                     name=f"diagnostic_{mode}", daemon=True).start()
+
 # Variables globales pour gérer l'état MQTT
 mqtt_connected = False
+# Passe à True à la première publication d'un cycle de mesures
+cycle_publie = False
 client = None
 
 # Callbacks MQTT
@@ -418,6 +1105,7 @@ def on_connect(client, userdata, flags, rc):
         client.subscribe("ungaro/commande/marche")
         client.subscribe("ungaro/commande/arret")
         client.subscribe("ungaro/commande/raz_erreur")
+        client.subscribe("ungaro/diagnostic/commande")
         logger.info("Abonnement aux topics de contrôle")
         # Publier la configuration Discovery
         publier_mqtt_discovery(client)
@@ -449,10 +1137,13 @@ def on_message(client, userdata, msg):
                 # Formatage de la commande avec la nouvelle consigne
                 commande = f"B20180000000000{nouvelle_consigne:03d}"
                 reponse = envoyer_commande_tcp(adresse_ip, port_tcp, commande)
+                horodatage = datetime.now().astimezone().isoformat(timespec='milliseconds')
                 
                 if reponse and reponse.startswith('A20180000000000'):
                     logger.info(f"Consigne eau modifiée: {nouvelle_consigne}°C")
-                    # Publier la nouvelle valeur
+                    # Publier la nouvelle valeur, horodatée à la confirmation de la chaudière
+                    client.publish("ungaro/temperature/consigne_eau/mesure",
+                                   message_mesure(nouvelle_consigne, horodatage, None, "commande"), retain=True)
                     client.publish("ungaro/temperature/consigne_eau", str(nouvelle_consigne), retain=True)
                 else:
                     logger.error(f"Erreur modification consigne eau: {reponse}")
@@ -493,6 +1184,9 @@ def on_message(client, userdata, msg):
             logger.info("RAZ code erreur effectuée")
         else:
             logger.error(f"Erreur RAZ code erreur: {reponse}")
+    elif msg.topic == "ungaro/diagnostic/commande":
+        # Commande de diagnostic (profil CPU, mémoire)
+        traiter_commande_diagnostic(client, msg.payload.decode())
 
 def on_log(client, userdata, level, buf):
     logger.debug(buf)
@@ -510,6 +1204,7 @@ def reconnect_to_mqtt():
             client.subscribe("ungaro/commande/marche")
             client.subscribe("ungaro/commande/arret")
             client.subscribe("ungaro/commande/raz_erreur")
+            client.subscribe("ungaro/diagnostic/commande")
             logger.info("Reconnexion réussie, réabonnement aux topics.")
             mqtt_connected = True
             break  
@@ -538,6 +1233,10 @@ def main():
         mqtt_user = os.environ.get('MQTT_USER', '')
         mqtt_password = os.environ.get('MQTT_PASSWORD', '')
         intervalle_maj = int(os.environ.get('INTERVALLE_MAJ', '30'))
+        proxy_actif = os.environ.get('PROXY_ACTIF', 'false') == 'true'
+        proxy_fraicheur = int(os.environ.get('PROXY_FRAICHEUR', '10'))
+        delai_trame_min = float(os.environ.get('DELAI_TRAME_MIN', '0.2'))
+        delai_trame_max = float(os.environ.get('DELAI_TRAME_MAX', '5'))
         
         # Affichage de la configuration
         logger.info('Configuration en cours d\'utilisation:')
@@ -545,17 +1244,29 @@ def main():
         logger.info(f'Broker MQTT: {mqtt_host}:{mqtt_port}')
         logger.info(f'Utilisateur MQTT: {mqtt_user}')
         logger.info(f'Intervalle de publication: {intervalle_maj}s')
+        logger.info(f'Proxy TCP: {"actif" if proxy_actif else "inactif"}')
+        logger.info(f'Délai entre trames: {delai_trame_min}s - {delai_trame_max}s')
         
     except Exception as e:
         logger.error(f"Erreur configuration: {e}")
         return
     
+    regulateur_cadence.configurer(delai_trame_min, delai_trame_max)
+    
     # Test initial de la chaudière
     test_reponse = envoyer_commande_tcp(adresse_ip, port_tcp, "I30001000000000000")
     if not test_reponse:
         logger.error("Chaudière inaccessible - vérifiez l'adresse IP et le port")
         return
     
+    # Démarrage du proxy TCP pour les autres clients du bridge
+    serveur_proxy = None
+    if proxy_actif:
+        try:
+            serveur_proxy = demarrer_proxy(adresse_ip, port_tcp, proxy_fraicheur)
+        except OSError as e:
+            logger.error(f"Impossible de démarrer le proxy TCP: {e}")
+    
     # Création et configuration du client MQTT
     client = mqtt.Client()
     
@@ -582,159 +1293,25 @@ def main():
     logger.info("Surveillance démarrée")
     
     # Boucle principale
+    sequence = 0
     try:
         while True:
-            # Interroger l'état de la chaudière
-            reponse_etat = envoyer_commande_tcp(adresse_ip, port_tcp, "I30001000000000000")
-            
-            if reponse_etat:
-                code_etat, nom_etat = analyser_etat_chaudiere(reponse_etat)
-                
-                if code_etat is not None:
-                    logger.info(f"État chaudière: {code_etat} - {nom_etat}")
-                    
-                    # Publier seulement si MQTT est connecté
-                    if mqtt_connected:
-                        try:
-                            client.publish("ungaro/etat/code", str(code_etat), retain=True)
-                            client.publish("ungaro/etat/nom", nom_etat, retain=True)
-                        except Exception as e:
-                            logger.error(f"Erreur publication MQTT état: {e}")
-            
-            # Petite pause entre les requêtes
-            time.sleep(1)
-            
-            # Interroger les erreurs de la chaudière
-            reponse_erreur = envoyer_commande_tcp(adresse_ip, port_tcp, "I30002000000000000")
-            
-            if reponse_erreur:
-                code_erreur, nom_erreur = analyser_erreur_chaudiere(reponse_erreur)
-                
-                if code_erreur is not None:
-                    if code_erreur != 0:  # Afficher seulement si erreur
-                        logger.warning(f"Erreur chaudière: {code_erreur} - {nom_erreur}")
-                    
-                    # Publier seulement si MQTT est connecté
-                    if mqtt_connected:
-                        try:
-                            client.publish("ungaro/erreur/code", str(code_erreur), retain=True)
-                            client.publish("ungaro/erreur/nom", nom_erreur, retain=True)
-                        except Exception as e:
-                            logger.error(f"Erreur publication MQTT erreur: {e}")
-            
-            # Petite pause entre les requêtes
-            time.sleep(1)
-            
-            # Interroger la température de fumée
-            reponse_temp = envoyer_commande_tcp(adresse_ip, port_tcp, "I30005000000000000")
-            
-            if reponse_temp:
-                temperature_fumee = analyser_temperature_fumee(reponse_temp)
-                
-                if temperature_fumee is not None:
-                    logger.info(f"Température fumée: {temperature_fumee}°C")
-                    
-                    # Publier seulement si MQTT est connecté
-                    if mqtt_connected:
-                        try:
-                            client.publish("ungaro/temperature/fumee", str(temperature_fumee), retain=True)
-                        except Exception as e:
-                            logger.error(f"Erreur publication MQTT température: {e}")
+            sequence += 1
+            instantane = interroger_chaudiere(adresse_ip, port_tcp, sequence)
             
-            # Petite pause entre les requêtes
-            time.sleep(1)
+            # Publier seulement si MQTT est connecté
+            if mqtt_connected:
+                publier_mesures(client, instantane)
             
-            # Interroger la puissance de combustion
-            reponse_puissance = envoyer_commande_tcp(adresse_ip, port_tcp, "I30011000000000000")
-            
-            if reponse_puissance:
-                puissance_combustion = analyser_puissance_combustion(reponse_puissance)
-                
-                if puissance_combustion is not None:
-                    logger.info(f"Puissance combustion: {puissance_combustion}")
-                    
-                    # Publier seulement si MQTT est connecté
-                    if mqtt_connected:
-                        try:
-                            client.publish("ungaro/puissance/combustion", str(puissance_combustion), retain=True)
-                        except Exception as e:
-                            logger.error(f"Erreur publication MQTT puissance: {e}")
-            
-            # Petite pause entre les requêtes
-            time.sleep(1)
-            
-            # Interroger la température de l'eau
-            reponse_temp_eau = envoyer_commande_tcp(adresse_ip, port_tcp, "I30017000000000000")
-            
-            if reponse_temp_eau:
-                temperature_eau = analyser_temperature_eau(reponse_temp_eau)
-                
-                if temperature_eau is not None:
-                    logger.info(f"Température eau: {temperature_eau}°C")
-                    
-                    # Publier seulement si MQTT est connecté
-                    if mqtt_connected:
-                        try:
-                            client.publish("ungaro/temperature/eau", str(temperature_eau), retain=True)
-                        except Exception as e:
-                            logger.error(f"Erreur publication MQTT température eau: {e}")
-            
-            # Petite pause entre les requêtes
-            time.sleep(1)
-            
-            # Interroger la pression de l'eau
-            reponse_pression_eau = envoyer_commande_tcp(adresse_ip, port_tcp, "I30020000000000000")
-            
-            if reponse_pression_eau:
-                pression_eau = analyser_pression_eau(reponse_pression_eau)
-                
-                if pression_eau is not None:
-                    logger.info(f"Pression eau: {pression_eau} bar")
-                    
-                    # Publier seulement si MQTT est connecté
-                    if mqtt_connected:
-                        try:
-                            client.publish("ungaro/pression/eau", str(pression_eau), retain=True)
-                        except Exception as e:
-                            logger.error(f"Erreur publication MQTT pression eau: {e}")
-            
-            # Petite pause entre les requêtes
-            time.sleep(1)
-            
-            # Interroger la température de consigne de l'eau
-            reponse_temp_consigne = envoyer_commande_tcp(adresse_ip, port_tcp, "A20180000000000000")
-            
-            if reponse_temp_consigne:
-                temperature_consigne_eau = analyser_temperature_consigne_eau(reponse_temp_consigne)
-                
-                if temperature_consigne_eau is not None:
-                    logger.info(f"Température consigne eau: {temperature_consigne_eau}°C")
-                    
-                    # Publier seulement si MQTT est connecté
-                    if mqtt_connected:
-                        try:
-                            client.publish("ungaro/temperature/consigne_eau", str(temperature_consigne_eau), retain=True)
-                        except Exception as e:
-                            logger.error(f"Erreur publication MQTT température consigne eau: {e}")
-            
-            # Petite pause entre les requêtes
-            time.sleep(1)
-            
-            # Interroger la température extérieure mesurée par la chaudière
-            reponse_temp_ext_chaudiere = envoyer_commande_tcp(adresse_ip, port_tcp, "J30044000000000000")
-            
-            if reponse_temp_ext_chaudiere:
-                temperature_exterieure_chaudiere = analyser_temperature_exterieure_chaudiere(reponse_temp_ext_chaudiere)
-                
-                if temperature_exterieure_chaudiere is not None:
-                    logger.info(f"Température extérieure chaudière: {temperature_exterieure_chaudiere}°C")
-                    
-                    # Publier seulement si MQTT est connecté
-                    if mqtt_connected:
-                        try:
-                            client.publish("ungaro/temperature/exterieure_chaudiere", str(temperature_exterieure_chaudiere), retain=True)
-                        except Exception as e:
-                            logger.error(f"Erreur publication MQTT température extérieure chaudière: {e}")
+            # Statistiques du régulateur de cadence
+            statistiques = regulateur_cadence.statistiques()
+            logger.info(f"Cadence bridge: délai {statistiques['delai']}s, RTT {statistiques['rtt_ms']} ms, "
+                        f"taux d'erreur {statistiques['taux_erreur']}")
+            if mqtt_connected:
+                try:
+                    client.publish("ungaro/transport/statistiques", json.dumps(statistiques))
+                except Exception as e:
+                    logger.error(f"Erreur publication MQTT statistiques transport: {e}")
             
             time.sleep(intervalle_maj)
             
@@ -745,6 +1322,9 @@ def main():
         import traceback
         traceback.print_exc()
     finally:
+        if serveur_proxy:
+            serveur_proxy.shutdown()
+            serveur_proxy.server_close()
         if client:
             client.loop_stop()
             client.disconnect()